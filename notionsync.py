@@ -2,13 +2,60 @@
 Notion Blog Sync Script
 ========================
 Syncs blog posts from Notion to blogs.json for your static site
+
+Optional speedups, used automatically when installed:
+    pip install brotli markupsafe orjson ciso8601
+brotli lets requests accept br-compressed API responses.
 """
 
 import os
+import re
 import json
+import sqlite3
+import sys
+import time
 import requests
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from html import unescape
+from itertools import repeat
+from threading import BoundedSemaphore, Lock
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    from markupsafe import escape as _markup_escape
+
+    def escape(text):
+        """Escape text for HTML using markupsafe's C speedups"""
+        return str(_markup_escape(text))
+except ImportError:
+    from html import escape
+
+try:
+    from ciso8601 import parse_datetime
+except ImportError:
+    def parse_datetime(date_str):
+        """Parse an ISO 8601 timestamp"""
+        return datetime.fromisoformat(date_str.replace('Z', '+00:00'))
+
+try:
+    import orjson
+
+    json_loads = orjson.loads
+
+    def json_dumps(obj):
+        """Serialize to indented UTF-8 JSON bytes"""
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+except ImportError:
+    json_loads = json.loads
+
+    def json_dumps(obj):
+        """Serialize to indented UTF-8 JSON bytes"""
+        return json.dumps(obj, indent=2, ensure_ascii=False).encode('utf-8')
 
 load_dotenv()
 
@@ -16,25 +63,102 @@ load_dotenv()
 NOTION_TOKEN = os.getenv('NOTION_SECRET')
 DATABASE_ID = os.getenv('NOTIONDB_ID')
 OUTPUT_FILE = 'blogs.json'
+CACHE_FILE = '.notionsync_cache.db'
+# set NOTIONSYNC_REFRESH=1 to ignore the cache and re-render every page
+FORCE_REFRESH = os.getenv('NOTIONSYNC_REFRESH', '').lower() in ('1', 'true', 'yes')
+# bump whenever rendering output changes so cached pages are re-rendered
+RENDERER_VERSION = 2
 
 # Notion API settings
 NOTION_VERSION = "2022-06-28"
 BASE_URL = "https://api.notion.com/v1"
 
-def get_headers():
-    """Get headers for Notion API requests"""
-    return {
-        "Authorization": f"Bearer {NOTION_TOKEN}",
-        "Notion-Version": NOTION_VERSION,
-        "Content-Type": "application/json"
-    }
+# Notion allows an average of 3 requests per second per integration
+REQUESTS_PER_SECOND = 3
+MAX_CONCURRENT_REQUESTS = 3
+PAGE_WORKERS = 5
+request_slots = BoundedSemaphore(MAX_CONCURRENT_REQUESTS)
 
-def query_database(database_id):
-    """Query Notion database"""
-    url = f"{BASE_URL}/databases/{database_id}/query"
-    response = requests.post(url, headers=get_headers(), json={})
+# Headers for Notion API requests, built once and attached to the session
+HEADERS = {
+    "Notion-Version": NOTION_VERSION,
+    "Content-Type": "application/json"
+}
+if NOTION_TOKEN:
+    HEADERS["Authorization"] = f"Bearer {NOTION_TOKEN}"
+
+def create_session():
+    """Create a pooled keep-alive session for Notion API requests"""
+    session = requests.Session()
+    session.headers.update(HEADERS)
+    # Notion's query endpoint is a POST but only reads, so it is safe to retry too
+    retry = Retry(
+        total=8,
+        backoff_factor=0.5,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=['GET', 'POST'],
+        respect_retry_after_header=True,
+    )
+    adapter = HTTPAdapter(pool_connections=10, pool_maxsize=20, max_retries=retry)
+    session.mount('https://', adapter)
+    return session
+
+SESSION = create_session()
+
+class RateLimiter:
+    """Thread-safe token bucket that spaces out API requests"""
+    
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = Lock()
+    
+    def acquire(self):
+        """Block until a request may be sent"""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            wait = (1 - self.tokens) / self.rate if self.tokens < 1 else 0
+            self.tokens -= 1
+        if wait:
+            time.sleep(wait)
+
+rate_limiter = RateLimiter(REQUESTS_PER_SECOND, burst=REQUESTS_PER_SECOND)
+
+def notion_request(method, url, **kwargs):
+    """Send a rate-limited Notion API request and decode the JSON response"""
+    rate_limiter.acquire()
+    with request_slots:
+        response = SESSION.request(method, url, **kwargs)
     response.raise_for_status()
-    return response.json()
+    return json_loads(response.content)
+
+def get_database(database_id):
+    """Get a Notion database's schema"""
+    return notion_request('GET', f"{BASE_URL}/databases/{database_id}")
+
+def query_database(database_id, query_filter=None):
+    """Get all pages from a Notion database, optionally filtered server-side"""
+    url = f"{BASE_URL}/databases/{database_id}/query"
+    pages = []
+    has_more = True
+    start_cursor = None
+    
+    while has_more:
+        body = {'page_size': 100}
+        if query_filter:
+            body['filter'] = query_filter
+        if start_cursor:
+            body['start_cursor'] = start_cursor
+        data = notion_request('POST', url, json=body)
+        pages.extend(data.get('results', []))
+        has_more = data.get('has_more', False)
+        start_cursor = data.get('next_cursor')
+    
+    return pages
 
 def get_blocks(page_id):
     """Get all blocks from a page"""
@@ -45,186 +169,396 @@ def get_blocks(page_id):
     
     while has_more:
         params = {'start_cursor': start_cursor} if start_cursor else {}
-        response = requests.get(url, headers=get_headers(), params=params)
-        response.raise_for_status()
-        data = response.json()
-        blocks.extend(data.get('results', []))
+        data = notion_request('GET', url, params=params)
+        results = data.get('results', [])
+        # share one string object per block type with the BLOCK_HANDLERS/LIST_TAGS keys
+        for block in results:
+            if 'type' in block:
+                block['type'] = sys.intern(block['type'])
+        blocks.extend(results)
         has_more = data.get('has_more', False)
         start_cursor = data.get('next_cursor')
     
     return blocks
 
+def get_block_tree(page_id):
+    """Get a page's blocks plus all nested children, fetching each level concurrently"""
+    blocks = get_blocks(page_id)
+    children = {}
+    parent_ids = [block['id'] for block in blocks if block.get('has_children')]
+    with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_REQUESTS) as executor:
+        while parent_ids:
+            level = list(executor.map(get_blocks, parent_ids))
+            children.update(zip(parent_ids, level))
+            parent_ids = [block['id'] for child_blocks in level for block in child_blocks if block.get('has_children')]
+    return blocks, children
+
+# (annotation, opening tag, closing tag), applied innermost first
+_WRAPS = (
+    ('bold', '<strong>', '</strong>'),
+    ('italic', '<em>', '</em>'),
+    ('code', '<code>', '</code>'),
+    ('strikethrough', '<s>', '</s>'),
+)
+
 def rich_text_to_html(rich_text_array):
     """Convert Notion rich text to HTML"""
     if not rich_text_array:
         return ""
-    html = ""
+    parts = []
     for text_obj in rich_text_array:
-        content = text_obj.get('plain_text', '')
+        content = escape(text_obj.get('plain_text', ''))
         annotations = text_obj.get('annotations', {})
-        if annotations.get('bold'):
-            content = f"<strong>{content}</strong>"
-        if annotations.get('italic'):
-            content = f"<em>{content}</em>"
-        if annotations.get('code'):
-            content = f"<code>{content}</code>"
-        if annotations.get('strikethrough'):
-            content = f"<s>{content}</s>"
-        if text_obj.get('href'):
-            content = f'<a href="{text_obj["href"]}">{content}</a>'
-        html += content
-    return html
+        for key, open_tag, close_tag in _WRAPS:
+            if annotations.get(key):
+                content = f"{open_tag}{content}{close_tag}"
+        href = text_obj.get('href')
+        if href:
+            content = f'<a href="{escape(href)}">{content}</a>'
+        parts.append(content)
+    return ''.join(parts)
+
+def _block_paragraph(content):
+    text = rich_text_to_html(content.get('rich_text', []))
+    return f"<p>{text}</p>" if text else ""
+
+def _block_heading_1(content):
+    return f"<h1>{rich_text_to_html(content.get('rich_text', []))}</h1>"
+
+def _block_heading_2(content):
+    return f"<h2>{rich_text_to_html(content.get('rich_text', []))}</h2>"
+
+def _block_heading_3(content):
+    return f"<h3>{rich_text_to_html(content.get('rich_text', []))}</h3>"
+
+def _block_code(content):
+    code_text = rich_text_to_html(content.get('rich_text', []))
+    language = escape(content.get('language', 'plaintext'))
+    return f"<pre><code class='language-{language}'>{code_text}</code></pre>"
+
+def _block_list_item(content):
+    return f"<li>{rich_text_to_html(content.get('rich_text', []))}</li>"
+
+def _block_quote(content):
+    return f"<blockquote>{rich_text_to_html(content.get('rich_text', []))}</blockquote>"
+
+def _block_divider(content):
+    return "<hr>"
+
+def _block_callout(content):
+    text = rich_text_to_html(content.get('rich_text', []))
+    icon = content.get('icon', {})
+    emoji = icon.get('emoji', '💡') if icon.get('type') == 'emoji' else '💡'
+    return f"<div class='callout'>{emoji} {text}</div>"
+
+def _block_toggle(content):
+    return f"<details><summary>{rich_text_to_html(content.get('rich_text', []))}</summary></details>"
+
+def _block_image(content):
+    image_url = content.get('file', {}).get('url') or content.get('external', {}).get('url')
+    if not image_url:
+        return ""
+    image_url = escape(image_url)
+    caption_text = content.get('caption', [])
+    caption = rich_text_to_html(caption_text)
+    if caption:
+        alt = escape(''.join([text.get('plain_text', '') for text in caption_text]))
+        return f'<figure><img src="{image_url}" alt="{alt}"><figcaption>{caption}</figcaption></figure>'
+    return f'<img src="{image_url}" alt="Image">'
+
+BLOCK_HANDLERS = {
+    'paragraph': _block_paragraph,
+    'heading_1': _block_heading_1,
+    'heading_2': _block_heading_2,
+    'heading_3': _block_heading_3,
+    'code': _block_code,
+    'bulleted_list_item': _block_list_item,
+    'numbered_list_item': _block_list_item,
+    'quote': _block_quote,
+    'divider': _block_divider,
+    'callout': _block_callout,
+    'toggle': _block_toggle,
+    'image': _block_image,
+}
 
 def block_to_html(block):
     """Convert Notion block to HTML"""
     block_type = block.get('type')
-    block_content = block.get(block_type, {})
+    handler = BLOCK_HANDLERS.get(block_type)
+    return handler(block.get(block_type, {})) if handler else ""
+
+LIST_TAGS = {'bulleted_list_item': 'ul', 'numbered_list_item': 'ol'}
+_LIST_TEMPLATES = {'ul': '<ul>%s</ul>', 'ol': '<ol>%s</ol>'}
+
+class _RenderFrame:
+    """Rendering state for one level of sibling blocks"""
     
-    if block_type == 'paragraph':
-        text = rich_text_to_html(block_content.get('rich_text', []))
-        return f"<p>{text}</p>" if text else ""
-    elif block_type == 'heading_1':
-        text = rich_text_to_html(block_content.get('rich_text', []))
-        return f"<h1>{text}</h1>"
-    elif block_type == 'heading_2':
-        text = rich_text_to_html(block_content.get('rich_text', []))
-        return f"<h2>{text}</h2>"
-    elif block_type == 'heading_3':
-        text = rich_text_to_html(block_content.get('rich_text', []))
-        return f"<h3>{text}</h3>"
-    elif block_type == 'code':
-        code_text = rich_text_to_html(block_content.get('rich_text', []))
-        language = block_content.get('language', 'plaintext')
-        return f"<pre><code class='language-{language}'>{code_text}</code></pre>"
-    elif block_type == 'bulleted_list_item':
-        text = rich_text_to_html(block_content.get('rich_text', []))
-        return f"<li>{text}</li>"
-    elif block_type == 'numbered_list_item':
-        text = rich_text_to_html(block_content.get('rich_text', []))
-        return f"<li>{text}</li>"
-    elif block_type == 'quote':
-        text = rich_text_to_html(block_content.get('rich_text', []))
-        return f"<blockquote>{text}</blockquote>"
-    elif block_type == 'divider':
-        return "<hr>"
-    elif block_type == 'callout':
-        text = rich_text_to_html(block_content.get('rich_text', []))
-        icon = block_content.get('icon', {})
-        emoji = icon.get('emoji', '💡') if icon.get('type') == 'emoji' else '💡'
-        return f"<div class='callout'>{emoji} {text}</div>"
-    elif block_type == 'toggle':
-        text = rich_text_to_html(block_content.get('rich_text', []))
-        return f"<details><summary>{text}</summary></details>"
-    elif block_type == 'image':
-        image_url = block_content.get('file', {}).get('url') or block_content.get('external', {}).get('url')
-        caption = rich_text_to_html(block_content.get('caption', []))
-        if image_url:
-            if caption:
-                return f'<figure><img src="{image_url}" alt="{caption}"><figcaption>{caption}</figcaption></figure>'
-            return f'<img src="{image_url}" alt="Image">'
-    return ""
-
-def blocks_to_html(blocks):
-    """Convert blocks to HTML"""
-    html_parts = []
-    list_buffer = []
-    current_list_type = None
+    def __init__(self, blocks):
+        self.blocks = iter(blocks)
+        self.html_parts = []
+        self.list_buffer = []
+        self.list_type = None
     
-    for block in blocks:
-        block_type = block.get('type')
-        
-        if block_type in ['bulleted_list_item', 'numbered_list_item']:
-            list_type = 'ul' if block_type == 'bulleted_list_item' else 'ol'
-            if current_list_type != list_type:
-                if list_buffer:
-                    html_parts.append(f"<{current_list_type}>{''.join(list_buffer)}</{current_list_type}>")
-                    list_buffer = []
-                current_list_type = list_type
-            list_buffer.append(block_to_html(block))
+    def flush_list(self):
+        buffer = self.list_buffer
+        if buffer:
+            items = buffer[0] if len(buffer) == 1 else ''.join(buffer)
+            self.html_parts.append(_LIST_TEMPLATES[self.list_type] % items)
+            self.list_buffer = []
+        self.list_type = None
+    
+    def add(self, block):
+        list_type = LIST_TAGS.get(block.get('type'))
+        if list_type:
+            if self.list_type != list_type:
+                self.flush_list()
+                self.list_type = list_type
+            self.list_buffer.append(block_to_html(block))
         else:
-            if list_buffer:
-                html_parts.append(f"<{current_list_type}>{''.join(list_buffer)}</{current_list_type}>")
-                list_buffer = []
-                current_list_type = None
+            self.flush_list()
             html = block_to_html(block)
             if html:
-                html_parts.append(html)
-        
-        if block.get('has_children'):
-            child_blocks = get_blocks(block['id'])
-            child_html = blocks_to_html(child_blocks)
-            if child_html:
-                html_parts.append(child_html)
+                self.html_parts.append(html)
     
-    if list_buffer:
-        html_parts.append(f"<{current_list_type}>{''.join(list_buffer)}</{current_list_type}>")
+    def close(self):
+        self.flush_list()
+        return ''.join(self.html_parts)
+
+def blocks_to_html(blocks, children=None):
+    """Convert blocks and their prefetched children to HTML"""
+    children = children or {}
+    stack = [_RenderFrame(blocks)]
+    while True:
+        frame = stack[-1]
+        block = next(frame.blocks, None)
+        if block is None:
+            html = frame.close()
+            stack.pop()
+            if not stack:
+                return html
+            if html:
+                stack[-1].html_parts.append(html)
+        else:
+            frame.add(block)
+            if block.get('has_children'):
+                stack.append(_RenderFrame(children.get(block['id'], [])))
+
+@dataclass
+class PageMeta:
+    """Blog metadata read from a page's properties"""
+    title: str = "Untitled"
+    iso_date: str = field(default_factory=lambda: datetime.now().isoformat())
+    category: str = "General"
+    tags: list = field(default_factory=list)
+    excerpt: str = ""
+    published: bool = True
     
-    return ''.join(html_parts)
-
-def extract_title(properties):
-    """Extract title"""
-    title_prop = properties.get('Title') or properties.get('Name')
-    if title_prop and title_prop['type'] == 'title':
-        rich_text = title_prop.get('title', [])
-        return ''.join([text.get('plain_text', '') for text in rich_text])
-    return "Untitled"
-
-def extract_date(properties):
-    """Extract date"""
-    date_prop = properties.get('Date') or properties.get('Published')
-    if date_prop:
-        if date_prop['type'] == 'date' and date_prop.get('date'):
-            date_str = date_prop['date']['start']
-            date_obj = datetime.fromisoformat(date_str.replace('Z', '+00:00'))
-            return date_obj.strftime('%b %d, %Y')
-        elif date_prop['type'] == 'created_time':
-            date_obj = datetime.fromisoformat(date_prop['created_time'].replace('Z', '+00:00'))
-            return date_obj.strftime('%b %d, %Y')
-    return datetime.now().strftime('%b %d, %Y')
-
-def extract_category(properties):
-    """Extract category"""
-    category_prop = properties.get('Category') or properties.get('Type')
-    if category_prop:
-        if category_prop['type'] == 'select' and category_prop.get('select'):
-            return category_prop['select']['name']
-        elif category_prop['type'] == 'multi_select' and category_prop.get('multi_select'):
-            return category_prop['multi_select'][0]['name'] if category_prop['multi_select'] else "General"
-    return "General"
-
-def extract_tags(properties):
-    """Extract tags"""
-    tags_prop = properties.get('Tags') or properties.get('Labels')
-    if tags_prop and tags_prop['type'] == 'multi_select':
-        return [tag['name'] for tag in tags_prop.get('multi_select', [])]
-    return []
-
-def extract_excerpt(properties, content_html):
-    """Extract or generate excerpt"""
-    excerpt_prop = properties.get('Excerpt') or properties.get('Summary')
-    if excerpt_prop and excerpt_prop['type'] == 'rich_text':
-        rich_text = excerpt_prop.get('rich_text', [])
-        excerpt = ''.join([text.get('plain_text', '') for text in rich_text])
-        if excerpt:
-            return excerpt
+    @property
+    def date(self):
+        """Display date, e.g. 'Jan 05, 2024'"""
+        return parse_datetime(self.iso_date).strftime('%b %d, %Y')
+
+def _prop_title(prop):
+    if prop['type'] == 'title':
+        return ''.join([text.get('plain_text', '') for text in prop.get('title', [])])
+
+def _prop_date(prop):
+    if prop['type'] == 'date' and prop.get('date'):
+        return prop['date']['start']
+    elif prop['type'] == 'created_time':
+        return prop['created_time']
+
+def _prop_category(prop):
+    if prop['type'] == 'select' and prop.get('select'):
+        return prop['select']['name']
+    elif prop['type'] == 'multi_select' and prop.get('multi_select'):
+        return prop['multi_select'][0]['name']
+
+def _prop_tags(prop):
+    if prop['type'] == 'multi_select':
+        return [tag['name'] for tag in prop.get('multi_select', [])]
+
+def _prop_excerpt(prop):
+    if prop['type'] == 'rich_text':
+        return ''.join([text.get('plain_text', '') for text in prop.get('rich_text', [])])
+
+PUBLISHED_VALUES = ('published', 'live', 'public')
+
+def _prop_published(prop):
+    if prop['type'] == 'checkbox':
+        return prop.get('checkbox', False)
+    elif prop['type'] == 'select' and prop.get('select'):
+        return prop['select']['name'].lower() in PUBLISHED_VALUES
+
+# property name -> (PageMeta field, handler, rank); the lowest rank present wins
+PROPERTY_HANDLERS = {
+    'Title': (('title', _prop_title, 0),),
+    'Name': (('title', _prop_title, 1),),
+    'Date': (('iso_date', _prop_date, 0),),
+    'Published': (('iso_date', _prop_date, 1), ('published', _prop_published, 1)),
+    'Category': (('category', _prop_category, 0),),
+    'Type': (('category', _prop_category, 1),),
+    'Tags': (('tags', _prop_tags, 0),),
+    'Labels': (('tags', _prop_tags, 1),),
+    'Excerpt': (('excerpt', _prop_excerpt, 0),),
+    'Summary': (('excerpt', _prop_excerpt, 1),),
+    'Status': (('published', _prop_published, 0),),
+}
+
+def pick_properties(properties):
+    """Map each PageMeta field to the (rank, handler, name, property) that supplies it"""
+    chosen = {}
+    for name, prop in properties.items():
+        if not prop:
+            continue
+        for field_name, handler, rank in PROPERTY_HANDLERS.get(name, ()):
+            if field_name not in chosen or rank < chosen[field_name][0]:
+                chosen[field_name] = (rank, handler, name, prop)
+    return chosen
+
+def extract_all(properties):
+    """Extract all blog metadata in a single pass over the properties"""
+    meta = PageMeta()
+    for field_name, (rank, handler, name, prop) in pick_properties(properties).items():
+        value = handler(prop)
+        if value is not None:
+            setattr(meta, field_name, value)
+    return meta
+
+def build_published_filter(schema_properties):
+    """Build a database query filter that only matches published pages"""
+    chosen = pick_properties(schema_properties).get('published')
+    if not chosen:
+        return None
+    rank, handler, name, prop = chosen
+    if prop['type'] == 'checkbox':
+        return {"property": name, "checkbox": {"equals": True}}
+    if prop['type'] == 'select':
+        # pages with no status selected have always been treated as published
+        conditions = [{"property": name, "select": {"is_empty": True}}]
+        for option in prop.get('select', {}).get('options', []):
+            if option['name'].lower() in PUBLISHED_VALUES:
+                conditions.append({"property": name, "select": {"equals": option['name']}})
+        return {"or": conditions}
+    return None
+
+_PARAGRAPH_RE = re.compile(r'<p>(.*?)</p>', re.S)
+_TAG_RE = re.compile(r'<[^<]+?>')
+
+def extract_excerpt(excerpt, content_html):
+    """Use the excerpt property or generate one from the first paragraph, escaped for HTML"""
+    if excerpt:
+        return escape(excerpt)
     
     if content_html:
-        import re
-        paragraphs = re.findall(r'<p>(.*?)</p>', content_html)
-        if paragraphs:
-            text = re.sub('<[^<]+?>', '', paragraphs[0])
-            return text[:200] + '...' if len(text) > 200 else text
+        paragraph = _PARAGRAPH_RE.search(content_html)
+        if paragraph:
+            # unescape before truncating so an entity is never cut in half
+            text = unescape(_TAG_RE.sub('', paragraph.group(1)))
+            return escape(text[:200] + '...' if len(text) > 200 else text)
     return "No excerpt available."
 
-def extract_published_status(properties):
-    """Check if published"""
-    status_prop = properties.get('Status') or properties.get('Published')
-    if status_prop:
-        if status_prop['type'] == 'checkbox':
-            return status_prop.get('checkbox', False)
-        elif status_prop['type'] == 'select' and status_prop.get('select'):
-            return status_prop['select']['name'].lower() in ['published', 'live', 'public']
-    return True
+def _ensure_schema(conn):
+    """Create the pages table, replacing one written before renderer_version existed"""
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(pages)")]
+    if columns and 'renderer_version' not in columns:
+        conn.execute("DROP TABLE pages")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS pages ("
+        "page_id TEXT PRIMARY KEY, last_edited TEXT, synced_at TEXT, renderer_version INTEGER, "
+        "title TEXT, content TEXT, excerpt TEXT)"
+    )
+
+def load_cache(path):
+    """Load pages rendered by the current RENDERER_VERSION, keyed by page id"""
+    with closing(sqlite3.connect(path)) as conn, conn:
+        _ensure_schema(conn)
+        rows = conn.execute(
+            "SELECT page_id, last_edited, synced_at, content, excerpt FROM pages WHERE renderer_version = ?",
+            (RENDERER_VERSION,)
+        )
+        return {page_id: (last_edited, synced_at, content, excerpt) for page_id, last_edited, synced_at, content, excerpt in rows}
+
+def save_cache(path, rows):
+    """Store rendered pages so unchanged ones can be skipped next run"""
+    with closing(sqlite3.connect(path)) as conn, conn:
+        _ensure_schema(conn)
+        conn.executemany(
+            "INSERT OR REPLACE INTO pages "
+            "(page_id, last_edited, synced_at, renderer_version, title, content, excerpt) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            ((page_id, last_edited, synced_at, RENDERER_VERSION, title, content, excerpt)
+             for page_id, last_edited, synced_at, title, content, excerpt in rows)
+        )
+
+def is_cache_fresh(cached, last_edited_time):
+    """Check whether a cached row still matches the page it was rendered from"""
+    if not cached or not last_edited_time or cached[0] != last_edited_time:
+        return False
+    # Notion rounds last_edited_time down to the minute, so a later edit in the same
+    # minute keeps the same value; only trust rows fetched after that minute ended
+    return parse_datetime(cached[1]) >= parse_datetime(last_edited_time) + timedelta(minutes=1)
+
+def process_page(idx, page, total, cache):
+    """Convert a single Notion page to a blog entry and the time its content was fetched"""
+    try:
+        meta = extract_all(page.get('properties', {}))
+        
+        if not meta.published:
+            print(f"⏭️  Skipping unpublished post {idx}")
+            return None
+        
+        print(f"📄 Processing post {idx}/{total}...")
+        
+        # last_edited_time also changes when properties or nested blocks are edited
+        cached = cache.get(page['id'])
+        if is_cache_fresh(cached, page.get('last_edited_time')):
+            print(f"   Using cached content for: {meta.title}")
+            synced_at, content_html, excerpt = cached[1:]
+        else:
+            print(f"   Fetching content for: {meta.title}")
+            synced_at = datetime.now(timezone.utc).isoformat()
+            blocks, children = get_block_tree(page['id'])
+            content_html = blocks_to_html(blocks, children)
+            excerpt = extract_excerpt(meta.excerpt, content_html)
+        
+        blog_entry = {
+            "id": idx,
+            "title": meta.title,
+            "excerpt": excerpt,
+            "content": content_html,
+            "date": meta.date,
+            "iso_date": meta.iso_date,
+            "category": meta.category,
+            "tags": meta.tags
+        }
+        
+        print(f"   ✅ Processed: {meta.title}")
+        return blog_entry, synced_at
+        
+    except Exception as e:
+        print(f"   ❌ Error processing page {idx}: {e}")
+        return None
+
+def write_blogs(path, blogs):
+    """Stream blogs to a JSON file one entry at a time"""
+    tmp_path = f"{path}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(b'{\n  "blogs": [')
+            count = 0
+            for blog in blogs:
+                f.write(b',\n    ' if count else b'\n    ')
+                # encoded JSON has no raw newlines inside strings, so this only re-indents
+                f.write(json_dumps(blog).replace(b'\n', b'\n    '))
+                count += 1
+            f.write(b'\n  ]\n}' if count else b']\n}')
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    return count
 
 def sync_notion_to_blogs():
     """Main sync function"""
@@ -246,8 +580,9 @@ def sync_notion_to_blogs():
     
     try:
         print(f"📚 Fetching blog posts from database...")
-        data = query_database(DATABASE_ID)
-        pages = data.get('results', [])
+        schema = get_database(DATABASE_ID)
+        published_filter = build_published_filter(schema.get('properties', {}))
+        pages = query_database(DATABASE_ID, published_filter)
         print(f"✅ Found {len(pages)} pages")
     except Exception as e:
         print(f"❌ Failed to query database: {e}")
@@ -256,54 +591,41 @@ def sync_notion_to_blogs():
         print("   2. Set the correct NOTIONDB_ID in .env")
         return
     
-    blogs = []
-    for idx, page in enumerate(pages, 1):
+    cache = {}
+    if FORCE_REFRESH:
+        print("🔄 NOTIONSYNC_REFRESH set, re-rendering every page")
+    else:
         try:
-            properties = page.get('properties', {})
-            
-            if not extract_published_status(properties):
-                print(f"⏭️  Skipping unpublished post {idx}")
-                continue
-            
-            print(f"📄 Processing post {idx}/{len(pages)}...")
-            
-            title = extract_title(properties)
-            date = extract_date(properties)
-            category = extract_category(properties)
-            tags = extract_tags(properties)
-            
-            print(f"   Fetching content for: {title}")
-            blocks = get_blocks(page['id'])
-            content_html = blocks_to_html(blocks)
-            excerpt = extract_excerpt(properties, content_html)
-            
-            blog_entry = {
-                "id": idx,
-                "title": title,
-                "excerpt": excerpt,
-                "content": content_html,
-                "date": date,
-                "category": category,
-                "tags": tags
-            }
-            
-            blogs.append(blog_entry)
-            print(f"   ✅ Processed: {title}")
-            
-        except Exception as e:
-            print(f"   ❌ Error processing page {idx}: {e}")
-            continue
+            cache = load_cache(CACHE_FILE)
+        except sqlite3.Error as e:
+            print(f"⚠️  Could not read cache, fetching everything: {e}")
+    
+    with ThreadPoolExecutor(max_workers=PAGE_WORKERS) as executor:
+        results = list(executor.map(process_page, range(1, len(pages) + 1), pages, repeat(len(pages)), repeat(cache)))
+    
+    blogs = []
+    cache_rows = []
+    for page, result in zip(pages, results):
+        if result:
+            blog, synced_at = result
+            blogs.append(blog)
+            cache_rows.append((page['id'], page.get('last_edited_time'), synced_at, blog['title'], blog['content'], blog['excerpt']))
+    
+    try:
+        save_cache(CACHE_FILE, cache_rows)
+    except sqlite3.Error as e:
+        print(f"⚠️  Could not update cache: {e}")
     
-    blogs.sort(key=lambda x: datetime.strptime(x['date'], '%b %d, %Y'), reverse=True)
+    # sort by day only (the YYYY-MM-DD prefix is the displayed date), so posts on the
+    # same day keep their database order regardless of time or timezone suffixes
+    blogs.sort(key=lambda blog: blog['iso_date'][:10], reverse=True)
     
     for idx, blog in enumerate(blogs, 1):
         blog['id'] = idx
     
     try:
-        output_data = {"blogs": blogs}
-        with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
-            json.dump(output_data, f, indent=2, ensure_ascii=False)
-        print(f"\n✅ Successfully created {OUTPUT_FILE} with {len(blogs)} blog posts!")
+        count = write_blogs(OUTPUT_FILE, blogs)
+        print(f"\n✅ Successfully created {OUTPUT_FILE} with {count} blog posts!")
         print(f"📁 File saved to: {os.path.abspath(OUTPUT_FILE)}")
     except Exception as e:
         print(f"\n❌ Failed to write output file: {e}")